@@ -1,4 +1,6 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
 import re
 import os
@@ -6,8 +8,13 @@ import json
 import datetime
 import time
 import threading
+import functools
+import hashlib
+import contextlib
+import itertools
 from io import BytesIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.units import mm
@@ -16,6 +23,14 @@ from tqdm import tqdm
 from collections import defaultdict
 from PIL import Image
 
+# ReportLab globals are read at canvas creation, so set them once here rather than per PDF
+rl_config.pageCompression = 1
+rl_config.shapeChecking = 0
+rl_config.invariant = 1
+# Without the optional rl_accel extension ASCII85 runs in pure Python and dominates image
+# embedding; binary streams are equally valid PDF and ~20% smaller
+rl_config.useA85 = 0
+
 # --- CONFIGURATION ---
 PAGE_WIDTH_MM = 215.90
 PAGE_HEIGHT_MM = 279.40
@@ -35,6 +50,34 @@ DEFAULT_CUT_LINE_COLOR = "#000000"
 GRID_COLS = 3
 GRID_ROWS = 3
 
+# Downloads are latency-bound; scryfall_limiter does the pacing, workers just keep requests in flight
+DOWNLOAD_WORKERS = 32
+# Scryfall asks for at most ~10 requests per second on its API; the cards.scryfall.io image
+# CDN is not rate limited
+SCRYFALL_API_URL = "https://api.scryfall.com"
+SCRYFALL_MIN_INTERVAL = 0.1
+# Cap on simultaneous open requests against api.scryfall.com (disk writes are not counted)
+SCRYFALL_MAX_CONCURRENT = 8
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Scryfall 'png' renders are 745x1040; print copies are never made larger than this
+CARD_IMAGE_SIZE = (745, 1040)
+# Cards are embedded from a JPEG copy next to each cached PNG (745x1040 is already ~300 DPI)
+PRINT_IMAGE_SUFFIX = ".print.jpg"
+PRINT_JPEG_QUALITY = 85
+# Print copies are PIL work, which releases the GIL, so threads spread it over the cores
+PRINT_WORKERS = os.cpu_count() or 4
+
+# Scryfall layouts whose cards have a printed back face
+DFC_LAYOUTS = {'transform', 'modal_dfc', 'meld', 'double_faced_token', 'reversible_card'}
+# Layouts looked up for cards imported without one, kept next to the images (scryfall_id -> layout)
+LAYOUT_CACHE_FILE = "card_layouts.json"
+# Scryfall's /cards/collection accepts at most 75 identifiers per request
+SCRYFALL_COLLECTION_BATCH = 75
+
+ARCHIDEKT_DECK_RE = re.compile(r'/decks/(\d+)')
+FILENAME_STRIP_TABLE = str.maketrans({' ': '_', ',': None, '"': None})
+
 FOOTER_FONT = "Helvetica"
 FOOTER_SIZE = 10
 FOOTER_INSET_MM = 1
@@ -62,8 +105,10 @@ class RateLimiter:
         self.lock = threading.Lock()
 
     def wait(self):
+        # Each caller reserves the next free slot, so requests from all threads are spaced
+        # exactly min_interval apart; monotonic so clock adjustments can't stall or burst
         with self.lock:
-            current_time = time.time()
+            current_time = time.monotonic()
             elapsed = current_time - self.last_request_time
             wait_time = self.min_interval - elapsed
             
@@ -76,13 +121,63 @@ class RateLimiter:
         if wait_time > 0:
             time.sleep(wait_time)
 
-scryfall_limiter = RateLimiter(min_interval=0.1)
+scryfall_limiter = RateLimiter(min_interval=SCRYFALL_MIN_INTERVAL)
+
+# Preview and generate each build their own ProxyEngine, so parsed decks are shared
+# process-wide for a few minutes to avoid refetching the deck when the user hits "Go"
+PARSE_CACHE_TTL = 300
+parse_cache = {}
+parse_cache_lock = threading.Lock()
+# Raw Archidekt responses by deck id, so toggling sideboard/maybeboard or batching the
+# same deck with others reuses the fetch; read-only once stored
+archidekt_cache = {}
+archidekt_cache_lock = threading.Lock()
+
+def create_http_session():
+    # One pooled keep-alive session per engine so card downloads reuse TLS connections.
+    # Retry also covers 429s (honouring Retry-After) with bounded exponential backoff
+    # instead of recursing by hand.
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504], respect_retry_after_header=True, allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': 'mtg_proxy_forge/1.0', 'Accept-Encoding': 'gzip'})
+    return session
+
+@functools.lru_cache(maxsize=4096)
+def clean_card_filename(name, set_code, collector_number, is_back=False):
+    # Called several times per card per PDF (download, placement, DFC split), so memoized
+    suffix = "_back" if is_back else ""
+    safe_name = name.replace(' // ', '_').translate(FILENAME_STRIP_TABLE).lower()[:100]
+    return f"{safe_name}_{set_code}_{collector_number}{suffix}.png"
+
+def expand_cards(cards):
+    # Parsers keep one entry per unique card with a 'count'; copies only appear at layout time
+    return list(itertools.chain.from_iterable(itertools.repeat(card, card.get('count', 1)) for card in cards))
+
+def flatten_to_rgb(img):
+    # Flatten transparent corners onto white paper; the clip path rounds them anyway
+    if img.mode in ('RGBA', 'LA', 'P'):
+        rgba = img.convert('RGBA')
+        flat = Image.new('RGB', rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel('A'))
+        return flat
+    return img.convert('RGB')
 
 class ProxyEngine:
     def __init__(self, progress_callback=None):
         self.progress_callback = progress_callback
         self.downloaded_files_this_run = set()
         self.download_tracker_lock = threading.Lock()
+        self.downloads_in_flight = {}
+        self._file_cache = {}
+        self._layout_cache = {}
+        self._image_urls = {}
+        self._card_layouts = {}
+        self._looked_up_ids = set()
+        self.scryfall_host_slots = threading.BoundedSemaphore(SCRYFALL_MAX_CONCURRENT)
+        self.session = create_http_session()
 
     def log(self, message):
         if self.progress_callback:
@@ -91,13 +186,20 @@ class ProxyEngine:
             print(message)
 
     def parse_input(self, input_str, include_maybeboard=False, include_sideboard=False):
+        key = (input_str, include_maybeboard, include_sideboard)
+        with parse_cache_lock:
+            cached = parse_cache.get(key)
+        if cached and time.time() - cached[0] < PARSE_CACHE_TTL:
+            # Copies, so callers can't reorder or extend the cached decks
+            return [(list(cards), dict(meta)) for cards, meta in cached[1]]
+
         # Handle multiple URLs (Batching)
         lines = [L.strip() for L in input_str.split('\n') if L.strip()]
         
         results = []
         for line in lines:
             if line.startswith('http'):
-                match = re.search(r'/decks/(\d+)', line)
+                match = ARCHIDEKT_DECK_RE.search(line)
                 if match:
                     deck_id = match.group(1)
                     cards, meta = self.fetch_archidekt_deck(deck_id, include_maybeboard, include_sideboard)
@@ -108,16 +210,47 @@ class ProxyEngine:
                 cards, meta = self.parse_csv_file(line)
                 results.append((cards, meta))
         
+        if results:
+            now = time.time()
+            with parse_cache_lock:
+                for stale_key in [k for k, (ts, _) in parse_cache.items() if now - ts >= PARSE_CACHE_TTL]:
+                    del parse_cache[stale_key]
+                parse_cache[key] = (now, [(list(cards), dict(meta)) for cards, meta in results])
         return results
 
-    def fetch_archidekt_deck(self, deck_id, include_maybeboard=False, include_sideboard=False):
+    def clear_cache(self):
+        with parse_cache_lock:
+            parse_cache.clear()
+        with archidekt_cache_lock:
+            archidekt_cache.clear()
+
+    def fetch_archidekt_json(self, deck_id):
+        with archidekt_cache_lock:
+            cached = archidekt_cache.get(deck_id)
+        if cached and time.time() - cached[0] < PARSE_CACHE_TTL:
+            return cached[1]
         self.log(f"Fetching deck {deck_id} from Archidekt...")
         url = f"https://archidekt.com/api/decks/{deck_id}/"
-        response = requests.get(url)
+        try:
+            response = self.session.get(url, timeout=10)
+        except requests.exceptions.RequestException as e:
+            self.log(f"Error: Failed to fetch deck {deck_id} ({e})")
+            return None
         if response.status_code != 200:
             self.log(f"Error: Failed to fetch deck {deck_id} (Status {response.status_code})")
-            return [], {'name': f"Error_Deck_{deck_id}", 'author': 'Unknown'}
+            return None
         data = response.json()
+        now = time.time()
+        with archidekt_cache_lock:
+            for stale_id in [k for k, (ts, _) in archidekt_cache.items() if now - ts >= PARSE_CACHE_TTL]:
+                del archidekt_cache[stale_id]
+            archidekt_cache[deck_id] = (now, data)
+        return data
+
+    def fetch_archidekt_deck(self, deck_id, include_maybeboard=False, include_sideboard=False):
+        data = self.fetch_archidekt_json(deck_id)
+        if data is None:
+            return [], {'name': f"Error_Deck_{deck_id}", 'author': 'Unknown'}
         if 'cards' not in data:
             self.log(f"Error: Unexpected API response for deck {deck_id}")
             return [], {'name': f"Error_Deck_{deck_id}", 'author': 'Unknown'}
@@ -142,148 +275,392 @@ class ProxyEngine:
             collector_number = card_data.get('collectorNumber')
             scryfall_id = card_data.get('uid')
             lang = oracle.get('lang', 'en')
-            for _ in range(quantity):
-                cards.append({
-                    'scryfall_id': scryfall_id,
-                    'lang': lang,
-                    'name': name,
-                    'set_code': set_code,
-                    'collector_number': collector_number
-                })
+            # None when Archidekt omits it, so split_by_faces looks the card up instead of guessing
+            layout = oracle.get('layout')
+            if quantity < 1:
+                continue
+            cards.append({
+                'scryfall_id': scryfall_id,
+                'lang': lang,
+                'name': name,
+                'set_code': set_code,
+                'collector_number': collector_number,
+                'layout': layout,
+                'count': quantity
+            })
         if not cards:
             self.log(f"Warning: No cards found in deck {deck_id}")
         cards.sort(key=lambda c: c['name'].lower())
-        self.log(f"Found {len(cards)} cards for {deck_name}.")
+        self.log(f"Found {sum(c['count'] for c in cards)} cards for {deck_name}.")
         return cards, {'name': deck_name, 'author': author}
 
     def parse_csv_file(self, file_path):
         cards = []
         with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return cards, {'name': 'CSV_Import', 'author': 'Unknown'}
+            idx = {h: i for i, h in enumerate(header)}
+            id_i, count_i, lang_i, name_i, set_i, num_i = (idx['scryfall_id'], idx['count'], idx['lang'], idx['name'], idx['set_code'], idx['collector_number'])
             for row in reader:
-                quantity = int(row['count'])
-                for _ in range(quantity):
-                    cards.append({
-                        'scryfall_id': row['scryfall_id'],
-                        'lang': row['lang'],
-                        'name': row['name'].strip('"'),
-                        'set_code': row['set_code'],
-                        'collector_number': row['collector_number']
-                    })
+                if not row: continue
+                count = int(row[count_i])
+                if count < 1: continue
+                cards.append({
+                    'scryfall_id': row[id_i],
+                    'lang': row[lang_i],
+                    'name': row[name_i].strip('"'),
+                    'set_code': row[set_i],
+                    'collector_number': row[num_i],
+                    'count': count
+                })
         cards.sort(key=lambda c: c['name'].lower())
         return cards, {'name': 'CSV_Import', 'author': 'Unknown'}
 
     def get_card_image_url(self, card, face="front", size="png"):
         # size can be 'png' (large high qual) or 'small' (for previews)
         if card['scryfall_id']:
-            base = f"https://api.scryfall.com/cards/{card['scryfall_id']}?format=image&version={size}"
+            resolved = self._image_urls.get(card['scryfall_id']) if size == "png" else None
+            if resolved and resolved[face == "back"]:
+                return resolved[face == "back"]
+            base = f"{SCRYFALL_API_URL}/cards/{card['scryfall_id']}?format=image&version={size}"
             if face == "back":
                 base += "&face=back"
             return base
         raise ValueError(f"Cannot get {face} face without scryfall_id for {card['name']}")
 
     def get_clean_filename(self, card, is_back=False):
-        suffix = "_back" if is_back else ""
-        safe_name = (
-            card['name']
-            .replace(' // ', '_')
-            .replace(',', '')
-            .replace(' ', '_')
-            .replace('"', '')
-            .lower()
-        )
-        safe_name = safe_name[:100]
-        return f"{safe_name}_{card['set_code']}_{card['collector_number']}{suffix}.png"
+        return clean_card_filename(card['name'], card['set_code'], card['collector_number'], is_back)
+
+    def cached_files(self, image_dir):
+        # One directory listing per image dir replaces a stat() per card; downloads keep it current
+        if image_dir not in self._file_cache:
+            self._file_cache.setdefault(image_dir, set(os.listdir(image_dir)) if os.path.isdir(image_dir) else set())
+        return self._file_cache[image_dir]
+
+    def image_exists(self, image_dir, filename):
+        return filename in self.cached_files(image_dir)
 
     def download_image(self, url, card=None, image_dir="", is_back=False):
-        if image_dir and card:
-            filename = self.get_clean_filename(card, is_back)
-            path = os.path.join(image_dir, filename)
-            if os.path.exists(path):
+        if not (image_dir and card):
+            return self._fetch_image(url)
+        filename = self.get_clean_filename(card, is_back)
+        path = os.path.join(image_dir, filename)
+        known_files = self.cached_files(image_dir)
+        # Another worker (e.g. a second deck sharing this card) may already be fetching it
+        with self.download_tracker_lock:
+            if filename in known_files:
                 return True
-        scryfall_limiter.wait()
+            pending = self.downloads_in_flight.get(path)
+            if pending is None:
+                self.downloads_in_flight[path] = threading.Event()
+        if pending is not None:
+            pending.wait()
+            return True if filename in known_files else None
         try:
-            response = requests.get(url, allow_redirects=True, timeout=10)
-            if response.status_code == 422: return None
-            if response.status_code == 429:
-                self.log(f"Rate limited (429). Backing off for 5 seconds...")
-                time.sleep(5)
-                return self.download_image(url, card, image_dir, is_back)
-            if response.status_code != 200:
-                self.log(f"Failed to download {url} (Status {response.status_code})")
-                return None
-            if image_dir and card:
-                with open(path, 'wb') as f:
-                    f.write(response.content)
+            result = self._fetch_image(url, path)
+            if result:
                 with self.download_tracker_lock:
-                    self.downloaded_files_this_run.add(path)
-                return True
+                    known_files.add(filename)
+            return result
+        finally:
+            with self.download_tracker_lock:
+                self.downloads_in_flight.pop(path).set()
+
+    def _fetch_image(self, url, path=None):
+        # Only API requests are paced; direct CDN links from resolve_image_urls go straight out
+        api_request = url.startswith(SCRYFALL_API_URL)
+        if api_request: scryfall_limiter.wait()
+        host_slot = self.scryfall_host_slots if api_request else contextlib.nullcontext()
+        try:
+            with host_slot, self.session.get(url, allow_redirects=True, timeout=10, stream=True) as response:
+                if response.status_code == 422: return None
+                if response.status_code != 200:
+                    self.log(f"Failed to download {url} (Status {response.status_code})")
+                    return None
+                if not path: return None
+                # Stream to a .part file so only one chunk per worker is held in memory and
+                # an interrupted transfer never shows up in the cache under the real name
+                part_path = path + ".part"
+                try:
+                    with open(part_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                    os.replace(part_path, path)
+                except Exception:
+                    if os.path.exists(part_path): os.remove(part_path)
+                    raise
+            with self.download_tracker_lock:
+                self.downloaded_files_this_run.add(path)
+            return True
         except requests.exceptions.RequestException as e:
             self.log(f"Error downloading image: {e}")
             return None
 
+    def print_image_path(self, image_dir, filename):
+        # Cards are embedded from a JPEG copy: ReportLab passes JPEG files straight through as
+        # /DCTDecode, so new PDFs skip the PNG decode and zlib pass for every unique card
+        print_name = filename[:-len('.png')] + PRINT_IMAGE_SUFFIX
+        print_path = os.path.join(image_dir, print_name)
+        source_path = os.path.join(image_dir, filename)
+        known_files = self.cached_files(image_dir)
+        if print_name in known_files:
+            return print_path
+        try:
+            with Image.open(source_path) as img:
+                img.thumbnail(CARD_IMAGE_SIZE, Image.Resampling.LANCZOS)
+                tmp_path = print_path + ".tmp"
+                flatten_to_rgb(img).save(tmp_path, format='JPEG', quality=PRINT_JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp_path, print_path)
+        except Exception as e:
+            self.log(f"Warning: Could not prepare {filename} for print ({e}). Embedding original.")
+            return source_path
+        # resolve_image_sources prepares copies on a pool, one filename per worker
+        with self.download_tracker_lock:
+            known_files.add(print_name)
+        return print_path
+
     def parallel_download(self, cards, image_dir, backs_pdf):
-        seen_keys = set()
-        unique_cards_to_download = []
         desc_text = "Downloading backs" if backs_pdf else "Downloading fronts"
-        for card in cards:
-            filename = self.get_clean_filename(card, is_back=backs_pdf)
+        self._schedule_downloads([(card, backs_pdf) for card in cards], image_dir, desc_text)
+
+    def _schedule_downloads(self, tasks, image_dir, desc_text):
+        # tasks are (card, is_back) pairs; fronts and backs can share one pool so the
+        # rate limiter stays busy instead of draining between the two waves
+        seen_keys = set()
+        pending = []
+        for card, is_back in tasks:
+            filename = self.get_clean_filename(card, is_back=is_back)
             if filename not in seen_keys:
-                unique_cards_to_download.append(card)
                 seen_keys.add(filename)
+                # Checked against the cached directory listing, so a warm cache submits nothing
+                if not self.image_exists(image_dir, filename):
+                    pending.append((card, is_back))
+        if pending:
+            self.resolve_image_urls([card for card, _ in pending])
+            # Backs the card data says don't exist would only earn a 422
+            pending = [(card, is_back) for card, is_back in pending if not (is_back and self.known_without_back(card))]
         
-        self.log(f"{desc_text}: Checking {len(unique_cards_to_download)} images...")
-        
-        total = len(unique_cards_to_download)
-        completed = 0
-        if total == 0: return
+        total = len(pending)
+        if total == 0:
+            if seen_keys: self.log(f"{desc_text}: all {len(seen_keys)} images cached, skipping downloads")
+            return
+        self.log(f"{desc_text}: Fetching {total} of {len(seen_keys)} images...")
+        completed = itertools.count(1)
+
+        def download_task(task):
+            card, is_back = task
+            url = self.get_card_image_url(card, face="back" if is_back else "front")
+            return self.download_image(url, card=card, image_dir=image_dir, is_back=is_back)
 
-        def download_task(card):
-            url = self.get_card_image_url(card, face="back" if backs_pdf else "front")
-            return self.download_image(url, card=card, image_dir=image_dir, is_back=backs_pdf)
+        def report_progress(_):
+            # Runs on the worker that finished; next() on a count is atomic, so no lock needed
+            done = next(completed)
+            if done % 5 == 0 or done == total:
+                self.log(f"{desc_text}: {done}/{total}")
             
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(download_task, card) for card in unique_cards_to_download]
-            for _ in as_completed(futures):
-                completed += 1
-                if completed % 5 == 0 or completed == total:
-                    self.log(f"{desc_text}: {completed}/{total}")
+        with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, total)) as executor:
+            for task in pending:
+                executor.submit(download_task, task).add_done_callback(report_progress)
+
+    def split_by_faces(self, cards, image_dir, probe_backs=False):
+        # Layout metadata decides DFC status for free; cards without it (CSV imports) get it
+        # from Scryfall's card data, and only cards that lookup can't settle have their back probed
+        sfc_cards, dfc_cards, unknown = [], [], []
+        for card in cards:
+            layout = card.get('layout')
+            if layout is None: unknown.append(card)
+            elif layout in DFC_LAYOUTS: dfc_cards.append(card)
+            else: sfc_cards.append(card)
+        if unknown:
+            # Card JSON (~2 KB, 75 per request) settles most of them without fetching any images
+            layouts = self.fetch_layouts(unknown, image_dir) if probe_backs else self.known_layouts(image_dir)
+            unresolved = []
+            for card in unknown:
+                layout = layouts.get(card['scryfall_id'])
+                if layout is None: unresolved.append(card)
+                elif layout in DFC_LAYOUTS: dfc_cards.append(card)
+                else: sfc_cards.append(card)
+            if probe_backs and unresolved:
+                self.parallel_download(unresolved, image_dir, backs_pdf=True)
+            for card in unresolved:
+                if self.image_exists(image_dir, self.get_clean_filename(card, is_back=True)): dfc_cards.append(card)
+                else: sfc_cards.append(card)
+            # Keep the deck's alphabetical order once both sources are merged
+            sfc_cards.sort(key=lambda c: c['name'].lower())
+            dfc_cards.sort(key=lambda c: c['name'].lower())
+        return sfc_cards, dfc_cards
+
+    def fetch_card_collection(self, scryfall_ids):
+        # Up to SCRYFALL_COLLECTION_BATCH card objects in one API request; None on failure
+        scryfall_limiter.wait()
+        try:
+            with self.scryfall_host_slots:
+                response = self.session.post(f"{SCRYFALL_API_URL}/cards/collection", json={'identifiers': [{'id': i} for i in scryfall_ids]}, timeout=10)
+        except requests.exceptions.RequestException as e:
+            self.log(f"Warning: Scryfall card lookup failed ({e})")
+            return None
+        if response.status_code != 200:
+            self.log(f"Warning: Scryfall card lookup failed (Status {response.status_code})")
+            return None
+        return response.json().get('data', [])
+
+    def lookup_cards(self, scryfall_ids):
+        # Each collection response fills both the image URL and the layout caches, so the layout
+        # lookup and the download URL lookup never send the same id twice; False on failure
+        missing = [i for i in dict.fromkeys(scryfall_ids) if i and i not in self._looked_up_ids]
+        for start in range(0, len(missing), SCRYFALL_COLLECTION_BATCH):
+            batch = missing[start:start + SCRYFALL_COLLECTION_BATCH]
+            found = self.fetch_card_collection(batch)
+            if found is None:
+                return False
+            self._looked_up_ids.update(batch)
+            for data in found:
+                self.record_card_data(data)
+        return True
+
+    def record_card_data(self, data):
+        card_id = data.get('id')
+        if not card_id:
+            return
+        if data.get('layout'):
+            self._card_layouts[card_id] = data['layout']
+        faces = data.get('card_faces') or []
+        if data.get('image_uris'):
+            urls = (data['image_uris'].get('png'), None)
+        elif len(faces) >= 2 and faces[0].get('image_uris'):
+            urls = (faces[0]['image_uris'].get('png'), (faces[1].get('image_uris') or {}).get('png'))
+        else:
+            return
+        if urls[0]:
+            self._image_urls[card_id] = urls
+
+    def resolve_image_urls(self, cards):
+        # One collection request per 75 cards yields direct cards.scryfall.io links, replacing a
+        # rate-limited api.scryfall.com redirect per image; unresolved cards keep the API URL
+        self.lookup_cards([card['scryfall_id'] for card in cards if card['scryfall_id'] not in self._image_urls])
+
+    def known_without_back(self, card):
+        resolved = self._image_urls.get(card['scryfall_id'])
+        return resolved is not None and resolved[1] is None
+
+    def known_layouts(self, image_dir):
+        if image_dir not in self._layout_cache:
+            try:
+                with open(os.path.join(image_dir, LAYOUT_CACHE_FILE), 'r', encoding='utf-8') as f:
+                    layouts = json.load(f)
+            except (OSError, ValueError):
+                layouts = {}
+            self._layout_cache[image_dir] = layouts
+        return self._layout_cache[image_dir]
+
+    def fetch_layouts(self, cards, image_dir):
+        layouts = self.known_layouts(image_dir)
+        missing = list({card['scryfall_id'] for card in cards if card['scryfall_id'] and card['scryfall_id'] not in layouts})
+        if not missing:
+            return layouts
+        to_fetch = [i for i in missing if i not in self._looked_up_ids]
+        if to_fetch:
+            self.log(f"Looking up layouts for {len(to_fetch)} cards...")
+            if not self.lookup_cards(to_fetch):
+                self.log("Warning: Layout lookup failed. Probing card backs instead.")
+        found = {i: self._card_layouts[i] for i in missing if i in self._card_layouts}
+        if not found:
+            return layouts
+        layouts.update(found)
+        try:
+            tmp_path = os.path.join(image_dir, LAYOUT_CACHE_FILE + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(layouts, f)
+            os.replace(tmp_path, os.path.join(image_dir, LAYOUT_CACHE_FILE))
+        except OSError as e:
+            self.log(f"Warning: Could not save card layouts ({e}).")
+        return layouts
 
     def resize_default_back(self, image_path):
         if not image_path or not os.path.exists(image_path):
             return None
         try:
-            img = Image.open(image_path)
             target_size = (750, 1050)
-            img_resized = img.resize(target_size, resample=Image.Resampling.LANCZOS)
-            buf = BytesIO()
-            img_resized.save(buf, format='PNG')
+            with Image.open(image_path) as img:
+                if img.size == target_size and img.mode in ('RGB', 'RGBA'):
+                    # Already print-ready, hand back the file untouched
+                    with open(image_path, 'rb') as f:
+                        return f.read()
+                # Lets the JPEG decoder downscale while decoding; no-op for other formats
+                img.draft('RGB', target_size)
+                # In place and skipped when already small enough; drawImage stretches to the slot anyway
+                img.thumbnail(target_size, Image.Resampling.LANCZOS)
+                buf = BytesIO()
+                img.save(buf, format='PNG', optimize=False, compress_level=1)
             return buf.getvalue()
         except Exception as e:
             self.log(f"Warning: Could not resize back image ({e}). Using original.")
             with open(image_path, 'rb') as f:
                 return f.read()
 
-    def draw_cut_lines(self, c, x_start, y_start_offset, spacing_x, spacing_y, color, thickness_mm):
+    def default_back_path(self, image_dir, image_bytes):
+        # The default back gets a print copy on disk too, named by content, so every placement
+        # shares one XObject by filename; an in-memory ImageReader would be re-hashed over its
+        # full pixel data at each placement
+        print_name = f"default_back_{hashlib.sha1(image_bytes).hexdigest()[:16]}{PRINT_IMAGE_SUFFIX}"
+        print_path = os.path.join(image_dir, print_name)
+        if self.image_exists(image_dir, print_name):
+            return print_path
+        try:
+            with Image.open(BytesIO(image_bytes)) as img:
+                tmp_path = print_path + ".tmp"
+                flatten_to_rgb(img).save(tmp_path, format='JPEG', quality=PRINT_JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp_path, print_path)
+        except Exception as e:
+            self.log(f"Warning: Could not prepare default back for print ({e}). Embedding from memory.")
+            return ImageReader(BytesIO(image_bytes))
+        with self.download_tracker_lock:
+            self.cached_files(image_dir).add(print_name)
+        return print_path
+
+    def resolve_image_sources(self, cards, image_dir, is_back=False, fallback=None):
+        # One lookup per unique card; duplicates reuse the same source (and so the same XObject)
+        filenames = [self.get_clean_filename(card, is_back) for card in cards]
+        present = [f for f in dict.fromkeys(filenames) if self.image_exists(image_dir, f)]
+        by_filename = dict.fromkeys(filenames, fallback)
+        # Missing print copies are built on a thread pool; a warm cache never starts one
+        to_prepare = [f for f in present if not self.image_exists(image_dir, f[:-len('.png')] + PRINT_IMAGE_SUFFIX)]
+        prepared = {}
+        if len(to_prepare) > 1:
+            with ThreadPoolExecutor(max_workers=min(PRINT_WORKERS, len(to_prepare))) as executor:
+                prepared = dict(zip(to_prepare, executor.map(lambda f: self.print_image_path(image_dir, f), to_prepare)))
+        for filename in present:
+            by_filename[filename] = prepared.get(filename) or self.print_image_path(image_dir, filename)
+        return [by_filename[f] for f in filenames]
+
+    def draw_cut_lines(self, c, col_xs, row_ys, color, thickness_mm):
         thickness_pt = thickness_mm * MM_TO_PT
         c.setLineWidth(thickness_pt)
-        c.setStrokeColor(HexColor(color))
+        c.setStrokeColor(color)
         
-        for col in range(GRID_COLS):
-            x_left = x_start + col * (CARD_WIDTH + spacing_x)
-            x_right = x_left + CARD_WIDTH
-            c.line(x_left, 0, x_left, PAGE_SIZE[1])
-            c.line(x_right, 0, x_right, PAGE_SIZE[1])
-        for row in range(GRID_ROWS):
-            y_bottom = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-            y_top = y_bottom + CARD_HEIGHT
-            c.line(0, y_bottom, PAGE_SIZE[0], y_bottom)
-            c.line(0, y_top, PAGE_SIZE[0], y_top)
-
-    def generate_pdf(self, cards, output_dir, filename_base, footer_text=None, image_dir="", padding=0, double_sided=False, default_back_image_bytes=None, cut_line_color="#000000", cut_line_thickness_mm=0.2):
+        # All cut lines go into one path so each page gets a single stroke operation
+        lines = []
+        for x_left in col_xs:
+            lines.append((x_left, 0, x_left, PAGE_SIZE[1]))
+            lines.append((x_left + CARD_WIDTH, 0, x_left + CARD_WIDTH, PAGE_SIZE[1]))
+        for y_bottom in row_ys:
+            lines.append((0, y_bottom, PAGE_SIZE[0], y_bottom))
+            lines.append((0, y_bottom + CARD_HEIGHT, PAGE_SIZE[0], y_bottom + CARD_HEIGHT))
+        c.lines(lines)
+
+    def draw_card(self, c, source, x, y, card_clip):
+        # The rounded clip is built once at the origin and moved into each slot with translate
+        c.saveState()
+        c.translate(x, y)
+        c.clipPath(card_clip, stroke=0, fill=0)
+        c.drawImage(source, 0, 0, width=CARD_WIDTH, height=CARD_HEIGHT, mask='auto')
+        c.restoreState()
+
+    def generate_pdf(self, cards, output_dir, filename_base, footer_text=None, image_dir="", padding=0, double_sided=False, default_back_image_bytes=None, cut_line_color="#000000", cut_line_thickness_mm=0.2, download_images=True):
         if not cards: return None
-        from reportlab import rl_config
-        rl_config.pageCompression = 1
+        cards = expand_cards(cards)
         output_path = os.path.join(output_dir, f"{filename_base}.pdf")
         final_footer_text = footer_text if footer_text else filename_base.replace('_', ' ')
         usable_width = PAGE_SIZE[0] - LEFT_MARGIN - RIGHT_MARGIN
@@ -297,13 +674,33 @@ class ProxyEngine:
         footer_y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - grid_height - FOOTER_BELOW_GRID
         left_footer_x = x_start + FOOTER_INSET
         right_footer_x = x_start + grid_width - FOOTER_INSET
+        # Slot origins only depend on padding, so compute them once per PDF
+        col_xs = [x_start + col * (CARD_WIDTH + spacing_x) for col in range(GRID_COLS)]
+        row_ys = [PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y for row in range(GRID_ROWS)]
+        # Parsed once; colour and font still have to be re-applied per page since showPage resets graphics state
+        line_color = HexColor(cut_line_color)
         
-        # 1. Ensure Images
-        self.parallel_download(cards, image_dir, backs_pdf=False)
-        if double_sided: self.parallel_download(cards, image_dir, backs_pdf=True)
+        # 1. Ensure Images (planned jobs fetch every face up front and pass download_images=False)
+        if download_images:
+            if double_sided:
+                tasks = [(card, False) for card in cards] + [(card, True) for card in cards]
+                self._schedule_downloads(tasks, image_dir, "Downloading fronts and backs")
+            else:
+                self.parallel_download(cards, image_dir, backs_pdf=False)
         
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+        # Card files are passed to drawImage by path: ReportLab keys the image XObject on the
+        # filename, so repeated cards (basics, 4-ofs) are embedded once and every further copy
+        # is just a /Do reference. Images are stretched straight into the slot (745x1040 is
+        # within 0.1% of 63x88mm); mask='auto' only matters for images that kept an alpha channel.
+        default_back_source = self.default_back_path(image_dir, default_back_image_bytes) if default_back_image_bytes else None
+        front_sources = self.resolve_image_sources(cards, image_dir, is_back=False)
+        back_sources = self.resolve_image_sources(cards, image_dir, is_back=True, fallback=default_back_source) if double_sided else None
+
+        # Written under a temporary name so a half-built PDF is never served for download
+        tmp_output_path = output_path + ".tmp"
+        c = canvas.Canvas(tmp_output_path, pagesize=PAGE_SIZE)
+        card_clip = c.beginPath()
+        card_clip.roundRect(0, 0, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
         self.log(f"Building PDF: {os.path.basename(output_path)}...")
         
         if double_sided:
@@ -313,27 +710,19 @@ class ProxyEngine:
                 page_num_base = (item_index // (GRID_COLS * GRID_ROWS)) + 1
                 self.log(f"Generating page {page_num_base * 2 - 1}/{total_pages} (Fronts)...")
                 # Front
-                self.draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y, cut_line_color, cut_line_thickness_mm)
+                self.draw_cut_lines(c, col_xs, row_ys, line_color, cut_line_thickness_mm)
                 placed = 0
                 while placed < GRID_ROWS * GRID_COLS and item_index < len(cards):
                     row = placed // GRID_COLS
                     col = placed % GRID_COLS
-                    x = x_start + col * (CARD_WIDTH + spacing_x)
-                    y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-                    card = cards[item_index]
-                    filename = self.get_clean_filename(card, is_back=False)
-                    local_path = os.path.join(image_dir, filename)
-                    if os.path.exists(local_path):
-                        img_reader = ImageReader(local_path)
-                        c.saveState()
-                        clip_path = c.beginPath()
-                        clip_path.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
-                        c.clipPath(clip_path, stroke=0, fill=0)
-                        c.drawImage(img_reader, x, y, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
-                        c.restoreState()
+                    x = col_xs[col]
+                    y = row_ys[row]
+                    local_path = front_sources[item_index]
+                    if local_path:
+                        self.draw_card(c, local_path, x, y, card_clip)
                     placed += 1
                     item_index += 1
-                c.setFillColor(HexColor(cut_line_color))
+                c.setFillColor(line_color)
                 c.setFont(FOOTER_FONT, FOOTER_SIZE)
                 c.drawString(left_footer_x, footer_y, final_footer_text)
                 c.drawRightString(right_footer_x, footer_y, f"{page_num_base * 2 - 1} / {total_pages}")
@@ -341,34 +730,20 @@ class ProxyEngine:
                 
                 # Back
                 self.log(f"Generating page {page_num_base * 2}/{total_pages} (Backs)...")
-                self.draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y, cut_line_color, cut_line_thickness_mm)
+                self.draw_cut_lines(c, col_xs, row_ys, line_color, cut_line_thickness_mm)
                 back_start = item_index - placed
                 col_order = range(GRID_COLS - 1, -1, -1)
                 placed = 0
                 while placed < GRID_ROWS * GRID_COLS and back_start + placed < len(cards):
                     row = placed // GRID_COLS
                     col = col_order[placed % GRID_COLS]
-                    x = x_start + col * (CARD_WIDTH + spacing_x)
-                    y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-                    card = cards[back_start + placed]
-                    back_filename = self.get_clean_filename(card, is_back=True)
-                    back_local_path = os.path.join(image_dir, back_filename)
-                    if not os.path.exists(back_local_path) and not default_back_image_bytes:
-                         pass # Should have been downloaded in parallel_download if exists
-                    
-                    img_data = None
-                    if os.path.exists(back_local_path): img_data = back_local_path
-                    elif default_back_image_bytes: img_data = BytesIO(default_back_image_bytes)
-                    if img_data:
-                        img_reader = ImageReader(img_data)
-                        c.saveState()
-                        clip_path = c.beginPath()
-                        clip_path.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
-                        c.clipPath(clip_path, stroke=0, fill=0)
-                        c.drawImage(img_reader, x, y, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
-                        c.restoreState()
+                    x = col_xs[col]
+                    y = row_ys[row]
+                    img_source = back_sources[back_start + placed]
+                    if img_source:
+                        self.draw_card(c, img_source, x, y, card_clip)
                     placed += 1
-                c.setFillColor(HexColor(cut_line_color))
+                c.setFillColor(line_color)
                 c.setFont(FOOTER_FONT, FOOTER_SIZE)
                 c.drawString(left_footer_x, footer_y, final_footer_text + " (Backs)")
                 c.drawRightString(right_footer_x, footer_y, f"{page_num_base * 2} / {total_pages}")
@@ -381,39 +756,37 @@ class ProxyEngine:
             while item_index < total_items:
                 page_num = (item_index // (GRID_COLS * GRID_ROWS)) + 1
                 self.log(f"Generating page {page_num}/{total_pages}...")
-                self.draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y, cut_line_color, cut_line_thickness_mm)
+                self.draw_cut_lines(c, col_xs, row_ys, line_color, cut_line_thickness_mm)
                 for row in range(GRID_ROWS):
                     for col in range(GRID_COLS):
                         if item_index >= total_items: break
-                        x = x_start + col * (CARD_WIDTH + spacing_x)
-                        y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-                        card = cards[item_index]
-                        filename = self.get_clean_filename(card, is_back=False)
-                        local_path = os.path.join(image_dir, filename)
-                        if os.path.exists(local_path):
-                            img_reader = ImageReader(local_path)
-                            c.saveState()
-                            clip_path = c.beginPath()
-                            clip_path.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
-                            c.clipPath(clip_path, stroke=0, fill=0)
-                            c.drawImage(img_reader, x, y, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
-                            c.restoreState()
+                        x = col_xs[col]
+                        y = row_ys[row]
+                        local_path = front_sources[item_index]
+                        if local_path:
+                            self.draw_card(c, local_path, x, y, card_clip)
                         item_index += 1
-                c.setFillColor(HexColor(cut_line_color))
+                c.setFillColor(line_color)
                 c.setFont(FOOTER_FONT, FOOTER_SIZE)
                 c.drawString(left_footer_x, footer_y, final_footer_text)
                 c.drawRightString(right_footer_x, footer_y, f"{page_num} / {total_pages}")
                 c.showPage()
         c.save()
-        with open(output_path, 'wb') as f:
-            f.write(buffer.getvalue())
-        buffer.close()
+        os.replace(tmp_output_path, output_path)
         return output_path
 
     def run_job(self, input_str, output_dir, format_mode, padding_mm=0.0, include_maybeboard=False, include_sideboard=False, default_back_image=None, cut_line_color="#000000", cut_line_thickness=0.2):
+        try:
+            return self._run_job(input_str, output_dir, format_mode, padding_mm, include_maybeboard, include_sideboard, default_back_image, cut_line_color, cut_line_thickness)
+        finally:
+            # Release pooled connections; the session reopens them if the engine is used again
+            self.session.close()
+
+    def _run_job(self, input_str, output_dir, format_mode, padding_mm, include_maybeboard, include_sideboard, default_back_image, cut_line_color, cut_line_thickness):
         self.log(f"Starting job...")
         central_image_dir = os.path.abspath("card_images") # Central cache
         os.makedirs(central_image_dir, exist_ok=True)
+        self._file_cache[central_image_dir] = set(os.listdir(central_image_dir))
         os.makedirs(output_dir, exist_ok=True)
         
         padding_pt = padding_mm * MM_TO_PT
@@ -426,7 +799,12 @@ class ProxyEngine:
             self.log("No valid decks found to process.")
             return []
             
-        generated_files = []
+        # Every PDF of the job is planned first, so its images can be fetched in one pass;
+        # plans are generate_pdf keyword arguments
+        pdf_options = dict(image_dir=central_image_dir, padding=padding_pt, default_back_image_bytes=default_back_bytes,
+                           cut_line_color=cut_line_color, cut_line_thickness_mm=cut_line_thickness,
+                           download_images=False)
+        planned_pdfs = []
         
         for i, (cards, metadata) in enumerate(decks_to_process):
             resolved_deckname = metadata['name'] if metadata['name'] else f"Deck_{i+1}"
@@ -438,23 +816,12 @@ class ProxyEngine:
             os.makedirs(deck_folder, exist_ok=True)
             
             if format_mode == 'smart':
-                sfc_cards = []
-                dfc_cards = []
-                # Pre-check existence for smart split using central_cache info if possible, otherwise treat as SFC until we know
-                # For robustness in batch, we check DFC status by downloading backs 
-                self.parallel_download(cards, central_image_dir, backs_pdf=True) 
-                
-                for card in cards:
-                    back_filename = self.get_clean_filename(card, is_back=True)
-                    if os.path.exists(os.path.join(central_image_dir, back_filename)): dfc_cards.append(card)
-                    else: sfc_cards.append(card)
+                sfc_cards, dfc_cards = self.split_by_faces(cards, central_image_dir, probe_backs=True)
                 
                 if sfc_cards:
-                    path = self.generate_pdf(sfc_cards, deck_folder, f"{resolved_deckname.replace(' ', '_')}_Standard", footer_text, central_image_dir, padding_pt, False, None, cut_line_color, cut_line_thickness)
-                    if path: generated_files.append(path)
+                    planned_pdfs.append(dict(pdf_options, cards=sfc_cards, output_dir=deck_folder, filename_base=f"{resolved_deckname.replace(' ', '_')}_Standard", footer_text=footer_text, double_sided=False, default_back_image_bytes=None))
                 if dfc_cards:
-                    path = self.generate_pdf(dfc_cards, deck_folder, f"{resolved_deckname.replace(' ', '_')}_DoubleSided", footer_text + " (DFC)", central_image_dir, padding_pt, True, default_back_bytes, cut_line_color, cut_line_thickness)
-                    if path: generated_files.append(path)
+                    planned_pdfs.append(dict(pdf_options, cards=dfc_cards, output_dir=deck_folder, filename_base=f"{resolved_deckname.replace(' ', '_')}_DoubleSided", footer_text=footer_text + " (DFC)", double_sided=True))
                     
             else:
                 modes_to_run = []
@@ -464,12 +831,23 @@ class ProxyEngine:
                 
                 for is_double in modes_to_run:
                     suffix = "DoubleSided" if is_double else "Standard"
-                    path = self.generate_pdf(cards, deck_folder, f"{resolved_deckname.replace(' ', '_')}_{suffix}", footer_text, central_image_dir, padding_pt, is_double, default_back_bytes, cut_line_color, cut_line_thickness)
-                    if path: generated_files.append(path)
+                    planned_pdfs.append(dict(pdf_options, cards=cards, output_dir=deck_folder, filename_base=f"{resolved_deckname.replace(' ', '_')}_{suffix}", footer_text=footer_text, double_sided=is_double))
                     
+        # One burst for every face the job needs, so the Scryfall connections stay warm instead
+        # of each PDF fetching its own images between builds
+        self._schedule_downloads([(card, is_back) for plan in planned_pdfs
+                                  for is_back in ((False, True) if plan['double_sided'] else (False,)) for card in plan['cards']],
+                                 central_image_dir, "Downloading job images")
+        generated_files = self.build_pdfs(planned_pdfs)
         self.log(f"Job complete! Generated {len(generated_files)} files.")
         return generated_files
 
+    def build_pdfs(self, planned_pdfs):
+        # Built one after another: print copies are already prepared on a pool inside
+        # resolve_image_sources, and sequential builds keep each PDF's progress log contiguous
+        paths = [self.generate_pdf(**plan) for plan in planned_pdfs]
+        return [path for path in paths if path]
+
     def get_deck_structure(self, input_str, format_mode="smart", include_maybeboard=False, include_sideboard=False):
         # Preview Generation
         # Does NOT download high-res images. Uses scryfall small APIs.
@@ -488,21 +866,8 @@ class ProxyEngine:
             # Divide into batches (SFC vs DFC or Standard/Double)
             sub_jobs = []
             if format_mode == 'smart':
-                sfc, dfc = [], []
-                # Quick heuristic: if we have back image locally or scryfall ID suggests DFC?
-                # For preview speed, we'll assume SFC unless we can cheaply check. 
-                # Let's rely on cached 'back' files if they exist, else treat as SFC for preview (or check Scryfall data if we had it cached)
-                # To be accurate without downloading everything: We'll just list all as 'Standard' for preview 
-                # UNLESS we can check quickly. 
-                # IMPROVEMENT: Fetching deck from Archidekt already returned 'uid'. We need to know layout. 
-                # Currently we don't store layout from Archidekt. 
-                # For V2 Preview: We will just show them as one big list if 'smart' is tricky without data.
-                # BUT user wants to see "which mode is selected". 
-                # Let's try to detect DFC if we have local files. If not, they show as SFC.
-                for card in cards:
-                     back_filename = self.get_clean_filename(card, is_back=True)
-                     if os.path.exists(os.path.join(central_image_dir, back_filename)): dfc.append(card)
-                     else: sfc.append(card)
+                # Archidekt decks carry the layout; CSV cards fall back to cached back files (no downloads for preview)
+                sfc, dfc = self.split_by_faces(cards, central_image_dir, probe_backs=False)
                 
                 if sfc: sub_jobs.append(("Standard", sfc, False))
                 if dfc: sub_jobs.append(("Double Sided (DFC)", dfc, True))
@@ -512,6 +877,7 @@ class ProxyEngine:
                 sub_jobs.append(("Standard", cards, False))
             
             for label, card_subset, is_double in sub_jobs:
+                card_subset = expand_cards(card_subset)
                 pages = []
                 cards_per_page = GRID_ROWS * GRID_COLS
                 
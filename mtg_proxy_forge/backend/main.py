@@ -5,6 +5,8 @@ from pydantic import BaseModel
 from typing import Optional, List
 import uuid
 import os
+import threading
+from collections import deque
 from engine import ProxyEngine
 
 app = FastAPI()
@@ -12,29 +14,52 @@ app = FastAPI()
 # Mount static files (Frontend)
 app.mount("/static", StaticFiles(directory="../static"), name="static")
 
-# In-memory job store
+# In-memory job store. Jobs are only ever added, so plain dict access is safe across threads
 jobs = {}
+# Generated PDFs by basename, filled as jobs complete so downloads skip walking Output/
+file_index = {}
+# Files from before a restart are indexed by a single walk, on the first lookup miss
+file_index_lock = threading.Lock()
+file_index_loaded = False
+
+MAX_JOB_MESSAGES = 500
+STATUS_MESSAGE_TAIL = 50
 
 class JobStatus:
+    # Updated from the engine's worker thread while /api/status reads it, hence the lock
     def __init__(self):
         self.status = "pending"
-        self.messages = []
+        self.messages = deque(maxlen=MAX_JOB_MESSAGES)
         self.progress = 0
         self.result_files = []
+        self.lock = threading.Lock()
 
     def update(self, message):
-        self.messages.append(message)
-        # Simple heuristic progress update
-        self.progress = min(99, self.progress + 2)
+        with self.lock:
+            self.messages.append(message)
+            # Simple heuristic progress update
+            self.progress = min(99, self.progress + 2)
     
     def complete(self, files):
-        self.status = "completed"
-        self.progress = 100
-        self.result_files = files
+        with self.lock:
+            self.status = "completed"
+            self.progress = 100
+            self.result_files = files
 
     def fail(self, error):
-        self.status = "failed"
-        self.messages.append(f"Error: {str(error)}")
+        with self.lock:
+            self.status = "failed"
+            self.messages.append(f"Error: {str(error)}")
+
+    def snapshot(self):
+        with self.lock:
+            tail = list(self.messages)[-STATUS_MESSAGE_TAIL:]
+            return {
+                "status": self.status,
+                "progress": self.progress,
+                "messages": tail,
+                "files": [os.path.basename(f) for f in self.result_files] if self.result_files else []
+            }
 
 class GenerateRequest(BaseModel):
     url: str
@@ -67,10 +92,27 @@ def run_engine_task(job_id: str, request: GenerateRequest):
             cut_line_color=request.cut_line_color,
             cut_line_thickness=request.cut_line_thickness
         )
+        # Indexed before the job reports completed, so a client polling status never asks for
+        # a file the index doesn't know yet
+        for path in files:
+            file_index[os.path.basename(path)] = path
         job.complete(files)
     except Exception as e:
         job.fail(e)
 
+def index_existing_outputs(output_root):
+    # Walks Output/ at most once per process; later misses are unknown names and 404 straight
+    # away. Unfinished .tmp/.part files are never indexed
+    global file_index_loaded
+    with file_index_lock:
+        if file_index_loaded:
+            return
+        for root, dirs, files in os.walk(output_root):
+            for name in files:
+                if not name.endswith(('.tmp', '.part')):
+                    file_index.setdefault(name, os.path.join(root, name))
+        file_index_loaded = True
+
 @app.get("/")
 async def read_root():
     return FileResponse("../static/index.html")
@@ -100,19 +142,17 @@ async def preview_proxies(request: GenerateRequest):
 async def get_status(job_id: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
-    job = jobs[job_id]
-    return {
-        "status": job.status,
-        "progress": job.progress,
-        "messages": job.messages,
-        "files": [os.path.basename(f) for f in job.result_files] if job.result_files else []
-    }
+    return jobs[job_id].snapshot()
 
 @app.get("/api/download/{filename}")
 async def download_file(filename: str):
-    output_root = os.path.join(os.getcwd(), "Output")
-    # Walk to find file
-    for root, dirs, files in os.walk(output_root):
-        if filename in files:
-            return FileResponse(os.path.join(root, filename), filename=filename)
-    raise HTTPException(status_code=404, detail="File not found")
+    output_root = os.path.realpath(os.path.join(os.getcwd(), "Output"))
+    path = file_index.get(filename)
+    if not path:
+        index_existing_outputs(output_root)
+        path = file_index.get(filename)
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    if os.path.commonpath([output_root, os.path.realpath(path)]) != output_root:
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(path, filename=filename)
@@ -1,5 +1,7 @@
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
 import re
 import os
@@ -7,8 +9,12 @@ import json
 import datetime
 import time
 import threading
+import functools
+import hashlib
+import itertools
 from io import BytesIO
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.units import mm
@@ -17,6 +23,12 @@ from tqdm import tqdm
 from collections import defaultdict
 from PIL import Image
 
+# ReportLab globals are read at canvas creation, so set them once here rather than per PDF
+rl_config.pageCompression = 1
+# Without the optional rl_accel extension ASCII85 runs in pure Python and dominates image
+# embedding; binary streams are equally valid PDF and ~20% smaller
+rl_config.useA85 = 0
+
 # --- CONFIGURATION ---
 PAGE_WIDTH_MM = 215.90
 PAGE_HEIGHT_MM = 279.40
@@ -53,9 +65,39 @@ CUT_LINE_THICKNESS = CUT_LINE_THICKNESS_MM * MM_TO_PT
 FOOTER_INSET = FOOTER_INSET_MM * MM_TO_PT
 FOOTER_BELOW_GRID = FOOTER_BELOW_GRID_MM * MM_TO_PT
 
+# Downloads are latency-bound; scryfall_limiter does the pacing, workers just keep requests in flight
+DOWNLOAD_WORKERS = 16
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Scryfall 'png' renders are 745x1040 (~300 DPI at 63x88mm); print copies are never larger
+CARD_IMAGE_SIZE = (745, 1040)
+# Cards are embedded from a JPEG copy next to each cached PNG
+PRINT_IMAGE_SUFFIX = ".print.jpg"
+PRINT_JPEG_QUALITY = 85
+# Print copies are PIL work, which releases the GIL, so threads spread it over the cores
+PRINT_WORKERS = os.cpu_count() or 4
+
 # Global set to track which files were downloaded IN THIS RUN
 downloaded_files_this_run = set()
 download_tracker_lock = threading.Lock()
+# Image paths already checked this run: True if on disk, False if Scryfall has no such face (422).
+# Later passes over the same cards (generate_pdf, smart split, other decks in a batch) skip the stat
+checked_files = {}
+# One listing per image dir answers every other existence check without a stat() per card
+dir_listings = {}
+
+def create_http_session():
+    # Pooled keep-alive connections; Retry handles 429s (honouring Retry-After) with
+    # bounded exponential backoff instead of recursing by hand
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504], respect_retry_after_header=True, allowed_methods=['GET'])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_WORKERS, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': 'mtg_proxy_tool/1.0'})
+    return session
+
+http_session = create_http_session()
 
 # --- THREAD-SAFE RATE LIMITER ---
 class RateLimiter:
@@ -65,8 +107,10 @@ class RateLimiter:
         self.lock = threading.Lock()
 
     def wait(self):
+        # Each caller reserves the next free slot, so requests from all threads are spaced
+        # exactly min_interval apart; monotonic so clock adjustments can't stall or burst
         with self.lock:
-            current_time = time.time()
+            current_time = time.monotonic()
             elapsed = current_time - self.last_request_time
             wait_time = self.min_interval - elapsed
             
@@ -106,7 +150,7 @@ def parse_batch_file(file_path):
 
 def fetch_archidekt_deck(deck_id, include_maybeboard=False, include_sideboard=False):
     url = f"https://archidekt.com/api/decks/{deck_id}/"
-    response = requests.get(url)
+    response = http_session.get(url, timeout=10)
     if response.status_code != 200:
         print(f"Error: Failed to fetch deck {deck_id} (Status {response.status_code})")
         return [], {'name': f"Error_Deck_{deck_id}", 'author': 'Unknown'}
@@ -135,14 +179,16 @@ def fetch_archidekt_deck(deck_id, include_maybeboard=False, include_sideboard=Fa
         collector_number = card_data.get('collectorNumber')
         scryfall_id = card_data.get('uid')
         lang = oracle.get('lang', 'en')
-        for _ in range(quantity):
-            cards.append({
-                'scryfall_id': scryfall_id,
-                'lang': lang,
-                'name': name,
-                'set_code': set_code,
-                'collector_number': collector_number
-            })
+        if quantity < 1:
+            continue
+        cards.append({
+            'scryfall_id': scryfall_id,
+            'lang': lang,
+            'name': name,
+            'set_code': set_code,
+            'collector_number': collector_number,
+            'count': quantity
+        })
     if not cards:
         print(f"Warning: No cards found in deck {deck_id}")
     cards.sort(key=lambda c: c['name'].lower())
@@ -154,17 +200,25 @@ def parse_csv(file_path):
         reader = csv.DictReader(f)
         for row in reader:
             quantity = int(row['count'])
-            for _ in range(quantity):
-                cards.append({
-                    'scryfall_id': row['scryfall_id'],
-                    'lang': row['lang'],
-                    'name': row['name'].strip('"'),
-                    'set_code': row['set_code'],
-                    'collector_number': row['collector_number']
-                })
+            if quantity < 1: continue
+            cards.append({
+                'scryfall_id': row['scryfall_id'],
+                'lang': row['lang'],
+                'name': row['name'].strip('"'),
+                'set_code': row['set_code'],
+                'collector_number': row['collector_number'],
+                'count': quantity
+            })
     cards.sort(key=lambda c: c['name'].lower())
     return cards, {'name': None, 'author': None}
 
+def expand_cards(cards):
+    # Parsers keep one entry per unique card with a 'count'; copies only appear at layout time
+    return list(itertools.chain.from_iterable(itertools.repeat(card, card.get('count', 1)) for card in cards))
+
+def count_cards(cards):
+    return sum(card.get('count', 1) for card in cards)
+
 def get_card_image_url(card, face="front"):
     if card['scryfall_id']:
         base = f"https://api.scryfall.com/cards/{card['scryfall_id']}?format=image&version=png"
@@ -173,42 +227,65 @@ def get_card_image_url(card, face="front"):
         return base
     raise ValueError(f"Cannot get {face} face without scryfall_id for {card['name']}")
 
-def get_clean_filename(card, is_back=False):
+FILENAME_STRIP_TABLE = str.maketrans({' ': '_', ',': None, '"': None})
+
+@functools.lru_cache(maxsize=4096)
+def clean_card_filename(name, set_code, collector_number, is_back=False):
+    # Called several times per card per PDF (download, placement, DFC split), so memoized
     suffix = "_back" if is_back else ""
-    safe_name = (
-        card['name']
-        .replace(' // ', '_')
-        .replace(',', '')
-        .replace(' ', '_')
-        .replace('"', '')
-        .lower()
-    )
-    safe_name = safe_name[:100]
-    return f"{safe_name}_{card['set_code']}_{card['collector_number']}{suffix}.png"
+    safe_name = name.replace(' // ', '_').translate(FILENAME_STRIP_TABLE).lower()[:100]
+    return f"{safe_name}_{set_code}_{collector_number}{suffix}.png"
+
+def get_clean_filename(card, is_back=False):
+    return clean_card_filename(card['name'], card['set_code'], card['collector_number'], is_back)
+
+def image_on_disk(path):
+    known = checked_files.get(path)
+    if known is not None:
+        return known
+    image_dir, filename = os.path.split(path)
+    image_dir = image_dir or "."
+    if image_dir not in dir_listings:
+        dir_listings.setdefault(image_dir, set(os.listdir(image_dir)) if os.path.isdir(image_dir) else set())
+    return filename in dir_listings[image_dir]
 
 def download_image(url, card=None, image_dir="", is_back=False):
     if image_dir and card:
         filename = get_clean_filename(card, is_back)
         path = os.path.join(image_dir, filename)
-        if os.path.exists(path):
+        if path in checked_files:
+            return True if checked_files[path] else None
+        if image_on_disk(path):
+            with download_tracker_lock:
+                checked_files[path] = True
             return True
     scryfall_limiter.wait()
     try:
-        response = requests.get(url, allow_redirects=True, timeout=10)
-        if response.status_code == 422: return None
-        if response.status_code == 429:
-            print(f"Rate limited (429). Backing off for 5 seconds...")
-            time.sleep(5)
-            return download_image(url, card, image_dir, is_back)
-        if response.status_code != 200:
-            print(f"Failed to download {url} (Status {response.status_code})")
-            return None
-        if image_dir and card:
-            with open(path, 'wb') as f:
-                f.write(response.content)
-            with download_tracker_lock:
-                downloaded_files_this_run.add(path)
-            return True
+        with http_session.get(url, allow_redirects=True, timeout=10, stream=True) as response:
+            if response.status_code == 422:
+                if image_dir and card:
+                    with download_tracker_lock:
+                        checked_files[path] = False
+                return None
+            if response.status_code != 200:
+                print(f"Failed to download {url} (Status {response.status_code})")
+                return None
+            if not (image_dir and card): return None
+            # Streamed in chunks to a .part file, so a worker never holds a whole image and an
+            # interrupted transfer never shows up under the real name
+            part_path = path + ".part"
+            try:
+                with open(part_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                os.replace(part_path, path)
+            except Exception:
+                if os.path.exists(part_path): os.remove(part_path)
+                raise
+        with download_tracker_lock:
+            downloaded_files_this_run.add(path)
+            checked_files[path] = True
+        return True
     except requests.exceptions.RequestException as e:
         print(f"Error downloading image: {e}")
         return None
@@ -218,7 +295,7 @@ def save_card_list_as_csv(cards, csv_path):
     card_info = {}
     for card in cards:
         key = (card['scryfall_id'], card['lang'], card['name'], card['set_code'], card['collector_number'])
-        card_dict[key] += 1
+        card_dict[key] += card.get('count', 1)
         card_info[key] = card
     sorted_items = sorted(card_dict.items(), key=lambda item: card_info[item[0]]['name'].lower())
     with open(csv_path, 'w', newline='', encoding='utf-8') as f:
@@ -229,21 +306,80 @@ def save_card_list_as_csv(cards, csv_path):
             writer.writerow([card['scryfall_id'] or '', count, card['lang'], card['name'], card['set_code'] or '', card['collector_number'] or ''])
 
 def parallel_download(cards, image_dir, backs_pdf):
-    seen_keys = set()
-    unique_cards_to_download = []
     desc_text = "Checking/Downloading backs" if backs_pdf else "Checking/Downloading fronts"
-    for card in cards:
-        filename = get_clean_filename(card, is_back=backs_pdf)
+    schedule_downloads([(card, backs_pdf) for card in cards], image_dir, desc_text)
+
+def download_both_faces(cards, image_dir):
+    # One pool for fronts and backs keeps the rate limiter busy instead of draining between waves
+    tasks = [(card, False) for card in cards] + [(card, True) for card in cards]
+    schedule_downloads(tasks, image_dir, "Checking/Downloading fronts and backs")
+
+def schedule_downloads(tasks, image_dir, desc_text):
+    seen_keys = set()
+    unique_tasks = []
+    for card, is_back in tasks:
+        filename = get_clean_filename(card, is_back=is_back)
         if filename not in seen_keys:
-            unique_cards_to_download.append(card)
             seen_keys.add(filename)
-    def download_task(card):
-        url = get_card_image_url(card, face="back" if backs_pdf else "front")
-        return download_image(url, card=card, image_dir=image_dir, is_back=backs_pdf)
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(download_task, card) for card in unique_cards_to_download]
-        for _ in tqdm(as_completed(futures), total=len(unique_cards_to_download), desc=desc_text, unit="img", leave=False):
-            pass
+            if os.path.join(image_dir, filename) not in checked_files:
+                unique_tasks.append((card, is_back))
+    def download_task(task):
+        card, is_back = task
+        url = get_card_image_url(card, face="back" if is_back else "front")
+        return download_image(url, card=card, image_dir=image_dir, is_back=is_back)
+    # Progress is bumped from each future's done callback; no future list is kept alive
+    with tqdm(total=len(unique_tasks), desc=desc_text, unit="img", leave=False) as pbar:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            for task in unique_tasks:
+                executor.submit(download_task, task).add_done_callback(lambda _: pbar.update(1))
+
+def flatten_to_rgb(img):
+    # Flatten transparent corners onto white paper; the clip path rounds them anyway
+    if img.mode in ('RGBA', 'LA', 'P'):
+        rgba = img.convert('RGBA')
+        flat = Image.new('RGB', rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel('A'))
+        return flat
+    return img.convert('RGB')
+
+def print_image_path(path):
+    # ReportLab passes JPEG files straight through as /DCTDecode, so PDFs built from the copy
+    # skip the PNG decode and zlib pass per unique card. Rebuilt if the PNG is newer.
+    print_path = path[:-len('.png')] + PRINT_IMAGE_SUFFIX
+    try:
+        if os.path.getmtime(print_path) >= os.path.getmtime(path):
+            return print_path
+    except OSError:
+        pass
+    try:
+        with Image.open(path) as img:
+            img.thumbnail(CARD_IMAGE_SIZE, Image.Resampling.LANCZOS)
+            tmp_path = print_path + ".tmp"
+            flatten_to_rgb(img).save(tmp_path, format='JPEG', quality=PRINT_JPEG_QUALITY, optimize=True, progressive=True)
+        os.replace(tmp_path, print_path)
+    except Exception as e:
+        print(f"Warning: Could not prepare {os.path.basename(path)} for print ({e}). Embedding original.")
+        return path
+    with download_tracker_lock:
+        # --purge_new removes the copy along with the download it came from
+        if path in downloaded_files_this_run: downloaded_files_this_run.add(print_path)
+    return print_path
+
+def default_back_path(image_dir, image_bytes):
+    # The default back gets a print copy on disk too, named by content, so every placement
+    # shares one XObject by filename instead of re-hashing an in-memory ImageReader
+    print_path = os.path.join(image_dir, f"default_back_{hashlib.sha1(image_bytes).hexdigest()[:16]}{PRINT_IMAGE_SUFFIX}")
+    if os.path.exists(print_path):
+        return print_path
+    try:
+        with Image.open(BytesIO(image_bytes)) as img:
+            tmp_path = print_path + ".tmp"
+            flatten_to_rgb(img).save(tmp_path, format='JPEG', quality=PRINT_JPEG_QUALITY, optimize=True, progressive=True)
+        os.replace(tmp_path, print_path)
+    except Exception as e:
+        print(f"Warning: Could not prepare default back for print ({e}). Embedding from memory.")
+        return ImageReader(BytesIO(image_bytes))
+    return print_path
 
 def resize_default_back(image_path):
     if not image_path or not os.path.exists(image_path):
@@ -260,24 +396,29 @@ def resize_default_back(image_path):
         with open(image_path, 'rb') as f:
             return f.read()
 
-def draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y):
+def draw_cut_lines(c, col_xs, row_ys):
     c.setLineWidth(CUT_LINE_THICKNESS)
     c.setStrokeColor(black)
-    for col in range(GRID_COLS):
-        x_left = x_start + col * (CARD_WIDTH + spacing_x)
-        x_right = x_left + CARD_WIDTH
-        c.line(x_left, 0, x_left, PAGE_SIZE[1])
-        c.line(x_right, 0, x_right, PAGE_SIZE[1])
-    for row in range(GRID_ROWS):
-        y_bottom = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-        y_top = y_bottom + CARD_HEIGHT
-        c.line(0, y_bottom, PAGE_SIZE[0], y_bottom)
-        c.line(0, y_top, PAGE_SIZE[0], y_top)
+    lines = []
+    for x_left in col_xs:
+        lines.append((x_left, 0, x_left, PAGE_SIZE[1]))
+        lines.append((x_left + CARD_WIDTH, 0, x_left + CARD_WIDTH, PAGE_SIZE[1]))
+    for y_bottom in row_ys:
+        lines.append((0, y_bottom, PAGE_SIZE[0], y_bottom))
+        lines.append((0, y_bottom + CARD_HEIGHT, PAGE_SIZE[0], y_bottom + CARD_HEIGHT))
+    c.lines(lines)
+
+def draw_card(c, source, x, y, card_clip):
+    # The rounded clip is built once at the origin and moved into each slot with translate
+    c.saveState()
+    c.translate(x, y)
+    c.clipPath(card_clip, stroke=0, fill=0)
+    c.drawImage(source, 0, 0, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
+    c.restoreState()
 
 def generate_pdf(cards, output_dir, filename_base, footer_text=None, image_dir="", padding=0, double_sided=False, default_back_image_bytes=None):
     if not cards: return None
-    from reportlab import rl_config
-    rl_config.pageCompression = 1
+    cards = expand_cards(cards)
     output_path = os.path.join(output_dir, f"{filename_base}.pdf")
     final_footer_text = footer_text if footer_text else filename_base.replace('_', ' ')
     usable_width = PAGE_SIZE[0] - LEFT_MARGIN - RIGHT_MARGIN
@@ -291,11 +432,36 @@ def generate_pdf(cards, output_dir, filename_base, footer_text=None, image_dir="
     footer_y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - grid_height - FOOTER_BELOW_GRID
     left_footer_x = x_start + FOOTER_INSET
     right_footer_x = x_start + grid_width - FOOTER_INSET
-    # 1. Ensure Images
-    parallel_download(cards, image_dir, backs_pdf=False)
-    if double_sided: parallel_download(cards, image_dir, backs_pdf=True)
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
+    col_xs = tuple(x_start + col * (CARD_WIDTH + spacing_x) for col in range(GRID_COLS))
+    row_ys = tuple(PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y for row in range(GRID_ROWS))
+    # Callers download both faces up front; anything still missing is fetched inline below
+    # Card files go to drawImage by path: ReportLab keys the image XObject on the filename, so
+    # repeated cards (basics, 4-ofs) are decoded and embedded once, and no decoded bitmaps are
+    # held for the whole PDF (an ImageReader is re-hashed over its full pixel data per placement)
+    default_back_source = default_back_path(image_dir, default_back_image_bytes) if default_back_image_bytes else None
+    # Resolved once per unique file: existence, the inline download fallback and the print copy
+    sources = {}
+    def ensure_image(card, is_back, allow_download=True):
+        path = os.path.join(image_dir, get_clean_filename(card, is_back))
+        if path not in sources:
+            found = image_on_disk(path)
+            if not found and allow_download:
+                found = bool(download_image(get_card_image_url(card, "back" if is_back else "front"), card, image_dir, is_back))
+            sources[path] = print_image_path(path) if found else None
+        return sources[path]
+    # Every unique face is resolved in parallel before drawing; the page loop itself is cheap
+    # and stays serial, so XObjects are still shared across the whole PDF
+    unique_faces = {}
+    for card in cards:
+        unique_faces.setdefault((get_clean_filename(card, False), False), card)
+        if double_sided: unique_faces.setdefault((get_clean_filename(card, True), True), card)
+    with ThreadPoolExecutor(max_workers=PRINT_WORKERS) as executor:
+        list(executor.map(lambda face: ensure_image(unique_faces[face], face[1], allow_download=not (face[1] and default_back_image_bytes)), unique_faces))
+    # Streamed straight to disk under a temporary name, then moved into place
+    tmp_output_path = output_path + ".tmp"
+    c = canvas.Canvas(tmp_output_path, pagesize=PAGE_SIZE)
+    card_clip = c.beginPath()
+    card_clip.roundRect(0, 0, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
     print(f"Building PDF: {os.path.basename(output_path)}...")
     if double_sided:
         total_pages = ((len(cards) + GRID_COLS * GRID_ROWS - 1) // (GRID_COLS * GRID_ROWS)) * 2
@@ -304,26 +470,16 @@ def generate_pdf(cards, output_dir, filename_base, footer_text=None, image_dir="
             while item_index < len(cards):
                 page_num_base = (item_index // (GRID_COLS * GRID_ROWS)) + 1
                 # Front
-                draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y)
+                draw_cut_lines(c, col_xs, row_ys)
                 placed = 0
                 while placed < GRID_ROWS * GRID_COLS and item_index < len(cards):
                     row = placed // GRID_COLS
                     col = placed % GRID_COLS
-                    x = x_start + col * (CARD_WIDTH + spacing_x)
-                    y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-                    card = cards[item_index]
-                    filename = get_clean_filename(card, is_back=False)
-                    local_path = os.path.join(image_dir, filename)
-                    if not os.path.exists(local_path):
-                        download_image(get_card_image_url(card, "front"), card, image_dir, False)
-                    if os.path.exists(local_path):
-                        img_reader = ImageReader(local_path)
-                        c.saveState()
-                        clip_path = c.beginPath()
-                        clip_path.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
-                        c.clipPath(clip_path, stroke=0, fill=0)
-                        c.drawImage(img_reader, x, y, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
-                        c.restoreState()
+                    x = col_xs[col]
+                    y = row_ys[row]
+                    local_path = ensure_image(cards[item_index], is_back=False)
+                    if local_path:
+                        draw_card(c, local_path, x, y, card_clip)
                     placed += 1
                     item_index += 1
                     pbar.update(1)
@@ -333,31 +489,19 @@ def generate_pdf(cards, output_dir, filename_base, footer_text=None, image_dir="
                 c.drawRightString(right_footer_x, footer_y, f"{page_num_base * 2 - 1} / {total_pages}")
                 c.showPage()
                 # Back
-                draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y)
+                draw_cut_lines(c, col_xs, row_ys)
                 back_start = item_index - placed
                 col_order = range(GRID_COLS - 1, -1, -1)
                 placed = 0
                 while placed < GRID_ROWS * GRID_COLS and back_start + placed < len(cards):
                     row = placed // GRID_COLS
                     col = col_order[placed % GRID_COLS]
-                    x = x_start + col * (CARD_WIDTH + spacing_x)
-                    y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-                    card = cards[back_start + placed]
-                    back_filename = get_clean_filename(card, is_back=True)
-                    back_local_path = os.path.join(image_dir, back_filename)
-                    if not os.path.exists(back_local_path) and not default_back_image_bytes:
-                        download_image(get_card_image_url(card, "back"), card, image_dir, True)
-                    img_data = None
-                    if os.path.exists(back_local_path): img_data = back_local_path
-                    elif default_back_image_bytes: img_data = BytesIO(default_back_image_bytes)
-                    if img_data:
-                        img_reader = ImageReader(img_data)
-                        c.saveState()
-                        clip_path = c.beginPath()
-                        clip_path.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
-                        c.clipPath(clip_path, stroke=0, fill=0)
-                        c.drawImage(img_reader, x, y, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
-                        c.restoreState()
+                    x = col_xs[col]
+                    y = row_ys[row]
+                    back_local_path = ensure_image(cards[back_start + placed], is_back=True, allow_download=not default_back_image_bytes)
+                    back_source = back_local_path or default_back_source
+                    if back_source:
+                        draw_card(c, back_source, x, y, card_clip)
                     placed += 1
                     pbar.update(1)
                 c.setFillColor(gray)
@@ -373,25 +517,15 @@ def generate_pdf(cards, output_dir, filename_base, footer_text=None, image_dir="
         with tqdm(total=total_items, desc="Placing cards", unit="item", leave=False) as pbar:
             while item_index < total_items:
                 page_num = (item_index // (GRID_COLS * GRID_ROWS)) + 1
-                draw_cut_lines(c, x_start, y_start_offset, spacing_x, spacing_y)
+                draw_cut_lines(c, col_xs, row_ys)
                 for row in range(GRID_ROWS):
                     for col in range(GRID_COLS):
                         if item_index >= total_items: break
-                        x = x_start + col * (CARD_WIDTH + spacing_x)
-                        y = PAGE_SIZE[1] - TOP_MARGIN - y_start_offset - (row + 1) * CARD_HEIGHT - row * spacing_y
-                        card = cards[item_index]
-                        filename = get_clean_filename(card, is_back=False)
-                        local_path = os.path.join(image_dir, filename)
-                        if not os.path.exists(local_path):
-                            download_image(get_card_image_url(card, "front"), card, image_dir, False)
-                        if os.path.exists(local_path):
-                            img_reader = ImageReader(local_path)
-                            c.saveState()
-                            clip_path = c.beginPath()
-                            clip_path.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, CORNER_RADIUS)
-                            c.clipPath(clip_path, stroke=0, fill=0)
-                            c.drawImage(img_reader, x, y, width=CARD_WIDTH, height=CARD_HEIGHT, preserveAspectRatio=True, mask='auto')
-                            c.restoreState()
+                        x = col_xs[col]
+                        y = row_ys[row]
+                        local_path = ensure_image(cards[item_index], is_back=False)
+                        if local_path:
+                            draw_card(c, local_path, x, y, card_clip)
                         item_index += 1
                         pbar.update(1)
                 c.setFillColor(gray)
@@ -400,9 +534,7 @@ def generate_pdf(cards, output_dir, filename_base, footer_text=None, image_dir="
                 c.drawRightString(right_footer_x, footer_y, f"{page_num} / {total_pages}")
                 c.showPage()
     c.save()
-    with open(output_path, 'wb') as f:
-        f.write(buffer.getvalue())
-    buffer.close()
+    os.replace(tmp_output_path, output_path)
     return output_path
 
 def run_single_mode(args):
@@ -422,17 +554,16 @@ def run_single_mode(args):
     deck_folder = os.path.join(output_root, resolved_deckname.replace(' ', '_').replace('/', '_'))
     os.makedirs(deck_folder, exist_ok=True)
     save_card_list_as_csv(cards, os.path.join(deck_folder, "deck_list.csv"))
-    parallel_download(cards, central_image_dir, backs_pdf=False)
-    parallel_download(cards, central_image_dir, backs_pdf=True)
+    download_both_faces(cards, central_image_dir)
     if args.format == 'smart':
         sfc_cards = []
         dfc_cards = []
         for card in cards:
             back_filename = get_clean_filename(card, is_back=True)
-            if os.path.exists(os.path.join(central_image_dir, back_filename)): dfc_cards.append(card)
+            if image_on_disk(os.path.join(central_image_dir, back_filename)): dfc_cards.append(card)
             else: sfc_cards.append(card)
-        print(f"Single-Faced Cards: {len(sfc_cards)}")
-        print(f"Double-Faced Cards: {len(dfc_cards)}")
+        print(f"Single-Faced Cards: {count_cards(sfc_cards)}")
+        print(f"Double-Faced Cards: {count_cards(dfc_cards)}")
         if sfc_cards:
             generate_pdf(sfc_cards, deck_folder, f"{resolved_deckname.replace(' ', '_')}_Standard", footer_text, central_image_dir, padding_pt, False, None)
         if dfc_cards:
@@ -464,11 +595,12 @@ def run_batch_mode(args):
     default_back_bytes = resize_default_back(args.default_back_image) if args.default_back_image else None
     decks_to_process = parse_batch_file(args.batch_file)
     print(f"Found {len(decks_to_process)} decks in batch file.")
-    master_dfc_list = []
+    # Fetch every deck list first so the image downloads run as one burst against Scryfall
+    fetched_decks = []
     for i, deck_entry in enumerate(decks_to_process):
         url = deck_entry['url']
         custom_name = deck_entry['custom_name']
-        print(f"\n--- Processing Deck {i+1}/{len(decks_to_process)} ---")
+        print(f"\n--- Fetching Deck {i+1}/{len(decks_to_process)} ---")
         try:
             match = re.search(r'/decks/(\d+)', url)
             if not match: continue
@@ -482,13 +614,19 @@ def run_batch_mode(args):
             deck_subdir = os.path.join(batch_dir, resolved_deckname.replace(" ", "_").replace("/", "_"))
             os.makedirs(deck_subdir, exist_ok=True)
             save_card_list_as_csv(cards, os.path.join(deck_subdir, "deck_list.csv"))
-            parallel_download(cards, central_image_dir, backs_pdf=False)
-            parallel_download(cards, central_image_dir, backs_pdf=True)
+            fetched_decks.append((url, cards, resolved_deckname, footer_text, deck_subdir))
+        except Exception as e:
+            print(f"Error processing deck {url}: {e}")
+    download_both_faces([card for _, cards, _, _, _ in fetched_decks for card in cards], central_image_dir)
+    master_dfc_list = []
+    for i, (url, cards, resolved_deckname, footer_text, deck_subdir) in enumerate(fetched_decks):
+        print(f"\n--- Processing Deck {i+1}/{len(fetched_decks)}: {resolved_deckname} ---")
+        try:
             if args.format == 'smart':
                 sfc_cards = []
                 for card in cards:
                     back_filename = get_clean_filename(card, is_back=True)
-                    if os.path.exists(os.path.join(central_image_dir, back_filename)):
+                    if image_on_disk(os.path.join(central_image_dir, back_filename)):
                         card_with_source = card.copy()
                         card_with_source['source_deck_name'] = resolved_deckname
                         master_dfc_list.append(card_with_source)
@@ -518,7 +656,7 @@ def run_batch_mode(args):
             for deck_name, cards in decks_dfc_map.items():
                 f.write(f"=== {deck_name} ===\n")
                 cards.sort(key=lambda x: x['name'])
-                for card in cards: f.write(f"- {card['name']}\n")
+                for card in expand_cards(cards): f.write(f"- {card['name']}\n")
                 f.write("\n")
     print(f"\nBatch processing complete!")
     if args.purge_new and downloaded_files_this_run: